@@ -2,12 +2,112 @@
 Base text analyzer interface and Chinese analyzer implementation.
 """
 
-from typing import Dict, List
+from collections import OrderedDict
+from functools import lru_cache
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import hanlp
+import torch
 from hanlp.utils.rules import split_sentence
 from loguru import logger
 
+_SVO_ROLES = {"ARG0": 0, "PRED": 1, "ARG1": 2}
+
+
+class SVO(NamedTuple):
+    """One subject-predicate-object triple; a missing role is an empty string."""
+
+    subject: str
+    predicate: str
+    object: str
+
+
+@lru_cache(maxsize=None)
+def _load_model(device: int, quantize: bool):
+    """
+    Loads the HanLP MTL model once per configuration, so every ChineseAnalyzer
+    shares a single resident copy of the weights.
+
+    With quantize, the encoder's Linear layers are swapped for dynamic int8
+    ones; the task heads stay in FP32. Callers only pass it for CPU devices.
+    """
+    logger.info("Loading HanLP model...")
+    if device == 0:
+        logger.info("Using GPU for acceleration.")
+    else:
+        logger.info("Using CPU for inference.")
+
+    model = hanlp.load(
+        hanlp.pretrained.mtl.CLOSE_TOK_POS_NER_SRL_UDEP_SDP_CON_ELECTRA_SMALL_ZH,
+        devices=device,
+    )
+    if quantize:
+        model.model.encoder = torch.ao.quantization.quantize_dynamic(
+            model.model.encoder, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        logger.info("Quantized encoder to int8.")
+    logger.success("HanLP model loaded.")
+    return model
+
+
+@lru_cache(maxsize=4096)
+def _split_sentences(text: str) -> Tuple[str, ...]:
+    """
+    Splits text into sentences that contain at least one word character;
+    punctuation-only fragments can never carry a predicate, so they are
+    dropped before inference. Memoized because books repeat the same
+    paragraphs (headers, separators, boilerplate) many times.
+    """
+    return tuple(s for s in split_sentence(text) if any(c.isalnum() for c in s))
+
+
+def _pas_to_svo(pas: List) -> Optional[SVO]:
+    """
+    Reduces one SRL predicate-argument structure to an SVO triple, or None
+    when it lacks a predicate or has neither subject nor object.
+    """
+    parts = ["", "", ""]
+    for form, role, _begin, _end in pas:
+        if role in _SVO_ROLES:
+            parts[_SVO_ROLES[role]] = form
+
+    svo = SVO._make(parts)
+    if not svo.predicate or not (svo.subject or svo.object):
+        return None
+    return svo
+
+
+def _extract_svo(sentences: Sequence[str], srl: List) -> Dict[str, List[SVO]]:
+    """
+    Maps each sentence to the SVO triples in its SRL predicate-argument
+    structures. Pure function of its inputs; no model state is involved.
+    """
+    sentence_svos = {}
+
+    for sentence, structures in zip(sentences, srl):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+
+        svo_results = list(dict.fromkeys(filter(None, map(_pas_to_svo, structures))))
+
+        if svo_results:
+            sentence_svos[sentence] = svo_results
+            logger.debug("Sentence: {}", sentence)
+            for result in svo_results:
+                logger.debug("  [SVO] S={} | V={} | O={}", *result)
+
+    return sentence_svos
+
 
 class ChineseAnalyzer:
     """
@@ -15,103 +115,109 @@ class ChineseAnalyzer:
     This implementation uses Semantic Role Labeling (SRL).
     """
 
-    def __init__(self):
-        logger.info("Loading HanLP model...")
-        import torch
-
+    def __init__(
+        self,
+        batch_size: int = 64,
+        cache_size: int = 10000,
+        quantize: bool = False,
+        bf16: bool = False,
+    ):
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, List] = OrderedDict()
         device = 0 if torch.cuda.is_available() else -1
-        if device == 0:
-            logger.info("Using GPU for acceleration.")
-        else:
-            logger.info("Using CPU for inference.")
-
-        self.hanlp = hanlp.load(
-            hanlp.pretrained.mtl.CLOSE_TOK_POS_NER_SRL_UDEP_SDP_CON_ELECTRA_SMALL_ZH,
-            devices=device,
-        )
-        logger.success("HanLP model loaded.")
-
-    def analyze(self, text: str) -> Dict[str, List[Dict[str, str]]]:
-        if not text:
-            return {}
-
-        sentences = list(split_sentence(text))
+        # bf16 keeps fp32's exponent range, so HanLP's large negative mask
+        # constants stay finite where fp16 would overflow. Opt-in, since SRL
+        # output parity with FP32 has not been checked.
+        self.mixed_precision = bf16 and device == 0 and torch.cuda.is_bf16_supported()
+        # Quantization only applies on CPU; normalizing it keeps the GPU
+        # memo key single so the model is never loaded twice there.
+        self.hanlp = _load_model(device, quantize and device == -1)
+
+    def analyze(self, text: str) -> Dict[str, List[SVO]]:
+        sentences = list(_split_sentences(text))
         if not sentences:
             return {}
 
-        docs = self.hanlp(sentences, tasks=["srl"], batch_size=32)
-        return self._extract_svo(sentences, docs)
+        return _extract_svo(sentences, self._srl(sentences))
 
-    def analyze_batch(self, texts: List[str]) -> List[Dict[str, List[Dict[str, str]]]]:
+    def analyze_batch(self, texts: List[str]) -> List[Dict[str, List[SVO]]]:
         """
         Analyze a batch of texts (e.g., paragraphs) for SVO structures.
-        Optimized for GPU utilization by processing all sentences in a single batch.
         """
-        all_sentences = []
-        text_sentence_counts = []
+        return list(self.analyze_stream(texts))
 
+    def analyze_stream(
+        self, texts: Iterable[str], chunk_sentences: int = 1024
+    ) -> Iterator[Dict[str, List[SVO]]]:
+        """
+        Yields the SVO structures of each text, in order. Sentences from
+        consecutive texts are pooled into chunks of about chunk_sentences per
+        HanLP call, so memory is bounded by one chunk rather than the input.
+        """
+        pending = []
+        pooled = 0
         for text in texts:
-            if not text:
-                text_sentence_counts.append(0)
-                continue
-            sents = [s for s in split_sentence(text) if s.strip()]
-            if not sents:
-                text_sentence_counts.append(0)
-                continue
-            all_sentences.extend(sents)
-            text_sentence_counts.append(len(sents))
-
-        if not all_sentences:
-            return [{} for _ in texts]
-
-        docs = self.hanlp(all_sentences, tasks=["srl"], batch_size=64)
-
-        results = []
-        current_idx = 0
-        for count in text_sentence_counts:
-            if count == 0:
-                results.append({})
-                continue
-            batch_sentences = all_sentences[current_idx : current_idx + count]
-            batch_srl = docs["srl"][current_idx : current_idx + count]
-            results.append(self._extract_svo(batch_sentences, {"srl": batch_srl}))
-            current_idx += count
-
-        return results
-
-    def _extract_svo(
-        self, sentences: List[str], docs: Dict
-    ) -> Dict[str, List[Dict[str, str]]]:
-        sentence_svos = {}
-        srl_data = docs.get("srl", [])
-
-        for i, sentence in enumerate(sentences):
-            sentence = sentence.strip()
-            if not sentence or i >= len(srl_data):
-                continue
-
-            svo_results = []
-            for pas in srl_data[i]:
-                predicate, subject, obj = "", "", ""
-                for form, role, _begin, _end in pas:
-                    if role == "PRED":
-                        predicate = form
-                    elif role == "ARG0":
-                        subject = form
-                    elif role == "ARG1":
-                        obj = form
-
-                if predicate and (subject or obj):
-                    svo_results.append(
-                        {"subject": subject, "predicate": predicate, "object": obj}
-                    )
-
-            if svo_results:
-                sentence_svos[sentence] = svo_results
-                logger.debug(f"Sentence: {sentence}")
-                for result in svo_results:
-                    logger.debug(
-                        f"  [SVO] S={result['subject']} | V={result['predicate']} | O={result['object']}"
-                    )
-
-        return sentence_svos
+            sentences = _split_sentences(text)
+            pending.append(sentences)
+            pooled += len(sentences)
+            if pooled >= chunk_sentences:
+                yield from self._analyze_pending(pending)
+                pending, pooled = [], 0
+
+        yield from self._analyze_pending(pending)
+
+    def _analyze_pending(
+        self, pending: List[Tuple[str, ...]]
+    ) -> Iterator[Dict[str, List[SVO]]]:
+        """
+        Runs one SRL pass over the pooled sentences of pending texts and
+        yields each text's SVO structures.
+        """
+        srl = self._srl([s for sentences in pending for s in sentences])
+        offset = 0
+        for sentences in pending:
+            yield _extract_svo(sentences, srl[offset : offset + len(sentences)])
+            offset += len(sentences)
+
+    def _srl(self, sentences: List[str]) -> List:
+        """
+        Returns SRL results for sentences in input order. Sentences seen
+        recently are served from an LRU cache; only misses reach HanLP, and
+        each distinct miss is inferred once per call.
+        """
+        known = {}
+        for sentence in sentences:
+            if sentence in self._cache:
+                self._cache.move_to_end(sentence)
+                known[sentence] = self._cache[sentence]
+
+        misses = [s for s in dict.fromkeys(sentences) if s not in known]
+        if misses:
+            known.update(zip(misses, self._infer(misses)))
+            for sentence in misses:
+                self._cache[sentence] = known[sentence]
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [known[s] for s in sentences]
+
+    def _infer(self, sentences: List[str]) -> List:
+        """
+        Runs SRL over sentences, feeding HanLP in length order so each batch
+        pads to similar lengths. Results come back in the input order.
+        """
+        order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+        with (
+            torch.inference_mode(),
+            torch.autocast("cuda", dtype=torch.bfloat16, enabled=self.mixed_precision),
+        ):
+            docs = self.hanlp(
+                [sentences[i] for i in order],
+                tasks=["srl"],
+                batch_size=self.batch_size,
+            )
+        srl = [None] * len(sentences)
+        for rank, i in enumerate(order):
+            srl[i] = docs["srl"][rank]
+        return srl
@@ -3,6 +3,7 @@ FastAPI application for Bionic Reading EPUB processor.
 """
 
 import tempfile
+from functools import lru_cache
 from pathlib import Path
 
 from fastapi import FastAPI, File, HTTPException, UploadFile
@@ -16,16 +17,11 @@ app = FastAPI(
     title="biocn API", description="Chinese bionic reading EPUB processor with HanLP"
 )
 
-# Global analyzer instance (lazy loaded)
-_analyzer: ChineseAnalyzer | None = None
-
 
+@lru_cache(maxsize=1)
 def get_analyzer() -> ChineseAnalyzer:
-    """Get or create the global ChineseAnalyzer instance."""
-    global _analyzer
-    if _analyzer is None:
-        _analyzer = ChineseAnalyzer()
-    return _analyzer
+    """Get the shared ChineseAnalyzer, creating it on first use."""
+    return ChineseAnalyzer()
 
 
 @app.post("/process")
@@ -71,7 +71,23 @@ def generate_default_output_path(ctx, _param, value):
     default=False,
     help="Use external CSS stylesheet instead of inline styles. Default is False (inline CSS).",
 )
-def cli(epub_path: Path, output_path: Path, no_inline_css: bool):
+@click.option(
+    "--quantize",
+    "quantize",
+    is_flag=True,
+    default=False,
+    help="Quantize the HanLP encoder to int8 for faster CPU inference. Ignored on GPU.",
+)
+@click.option(
+    "--bf16",
+    "bf16",
+    is_flag=True,
+    default=False,
+    help="Run GPU inference under bfloat16 autocast. Ignored on CPU.",
+)
+def cli(
+    epub_path: Path, output_path: Path, no_inline_css: bool, quantize: bool, bf16: bool
+):
     """Processes an EPUB file to apply bionic reading formatting to Chinese text."""
 
     # Configure loguru
@@ -86,7 +102,7 @@ def cli(epub_path: Path, output_path: Path, no_inline_css: bool):
     click.echo(f"Output: {output_path}\n")
 
     # Analyzer will log its loading status via loguru
-    chinese_analyzer = ChineseAnalyzer()
+    chinese_analyzer = ChineseAnalyzer(quantize=quantize, bf16=bf16)
 
     # Convert no_inline_css flag to inline_css parameter
     inline_css = not no_inline_css
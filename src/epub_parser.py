@@ -1,15 +1,51 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import posixpath
+import re
+import warnings
+import zipfile
+from typing import TYPE_CHECKING, Iterator
 
 import ebooklib
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag, XMLParsedAsHTMLWarning
+from bs4.element import PreformattedString
 from ebooklib import epub
 from loguru import logger
 
 if TYPE_CHECKING:
     from src.analyzer import ChineseAnalyzer
 
+# CJK Unified Ideographs and Extension A; paragraphs without any are skipped.
+_CJK_RE = re.compile(r"[\u4e00-\u9fff\u3400-\u4dbf]")
+
+# An SVO needs a predicate plus a subject or object, so a paragraph shorter
+# than two characters (page numbers, "完", ornaments) can never yield one.
+_MIN_ANALYZE_LEN = 2
+
+_INLINE_STYLES = {
+    "subject": {"style": "color: #D95F02; font-weight: bold;"},
+    "predicate": {"style": "color: #1B9E77; font-weight: bold;"},
+    "object": {"style": "color: #7570B3; font-weight: bold;"},
+}
+_CLASS_STYLES = {
+    "subject": {"class": "svo-subject"},
+    "predicate": {"class": "svo-predicate"},
+    "object": {"class": "svo-object"},
+}
+
+# Media types whose payload is already compressed; deflating them again only
+# burns CPU. SVG, TTF and OTF are left out because they do shrink.
+_STORED_MEDIA_TYPES = (
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+    "audio/",
+    "video/",
+    "font/woff",
+    "application/font-woff",
+)
+
 
 class EpubParser:
     """
@@ -27,7 +63,10 @@ class EpubParser:
         self.file_path = file_path
         self.book = epub.read_epub(self.file_path)
         self.inline_css = inline_css
+        # Span attributes per SVO component: inline styles or CSS classes
+        self._styles = _INLINE_STYLES if inline_css else _CLASS_STYLES
         self._fix_missing_toc_uids()
+        self._documents = tuple(self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
 
     def _fix_missing_toc_uids(self) -> None:
         """
@@ -52,7 +91,7 @@ class EpubParser:
         """
         Returns the number of documents in the EPUB file.
         """
-        return len(list(self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT)))
+        return len(self._documents)
 
     def parse_chinese(
         self,
@@ -72,21 +111,26 @@ class EpubParser:
         if not self.inline_css:
             self._inject_css_stylesheet()
 
-        documents = list(self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
         all_docs_data = []  # List of (item, soup, valid_paragraphs, texts)
 
         logger.info("Gathering all paragraphs for batch processing...")
         all_flattened_texts = []
 
-        for item in documents:
-            soup = BeautifulSoup(item.get_content(), "html.parser")
+        for item in self._documents:
+            # Raw content: get_content() would rebuild the whole document
+            # through lxml first, and ebooklib redoes that on write anyway.
+            # EPUB documents are XHTML, but ebooklib re-reads them with lxml's
+            # HTML parser when writing, so parsing them as HTML is deliberate.
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", XMLParsedAsHTMLWarning)
+                soup = BeautifulSoup(item.content, "lxml")
             paragraphs = soup.find_all("p")
             valid_paragraphs = []
             paragraph_texts = []
 
             for p in paragraphs:
                 text = p.get_text()
-                if text.strip():
+                if len(text.strip()) >= _MIN_ANALYZE_LEN and _CJK_RE.search(text):
                     valid_paragraphs.append(p)
                     paragraph_texts.append(text)
 
@@ -95,21 +139,27 @@ class EpubParser:
 
         if all_flattened_texts:
             logger.info(f"Total paragraphs to process: {len(all_flattened_texts)}")
-            # Process ALL paragraphs from ALL documents in one large batch
-            # This is the most efficient way for GPU utilization
-            all_results = chinese_analyzer.analyze_batch(all_flattened_texts)
-
-            # Unflatten and apply results
-            result_idx = 0
+            # Stream each distinct paragraph from ALL documents through the
+            # analyzer, which pools their sentences into large GPU batches
+            unique_results = chinese_analyzer.analyze_stream(
+                dict.fromkeys(all_flattened_texts)
+            )
+            svos_by_text = {}
+
+            # Unflatten and apply results as they stream in. Distinct texts
+            # arrive in first-seen order, which is the order met here.
             for item, soup, valid_paragraphs, paragraph_texts in all_docs_data:
                 logger.info(f"Applying results to document: {item.file_name}")
-                for p in valid_paragraphs:
-                    sentence_svos = all_results[result_idx]
-                    self._mark_svo_in_soup(p, sentence_svos)
-                    result_idx += 1
-
-                # Update the item content in the book
-                item.set_content(str(soup).encode("utf-8"))
+                changed = False
+                for p, text in zip(valid_paragraphs, paragraph_texts):
+                    if text not in svos_by_text:
+                        svos_by_text[text] = next(unique_results)
+                    changed |= self._mark_svo_in_soup(p, svos_by_text[text])
+
+                # Update the item content in the book; unmarked documents
+                # are left as read rather than serialized for nothing.
+                if changed:
+                    item.set_content(soup.encode("utf-8"))
                 if progress_callback:
                     progress_callback()
         else:
@@ -122,13 +172,16 @@ class EpubParser:
         Args:
             output_path: The path where the modified EPUB will be saved.
         """
-        epub.write_epub(output_path, self.book, {})
+        writer = _EpubWriter(output_path, self.book, {})
+        writer.process()
+        writer.write()
 
     def _inject_css_stylesheet(self) -> None:
         """
         Injects a CSS stylesheet for SVO highlighting into the EPUB.
 
-        The CSS is added as a new item in the book and linked from all HTML documents.
+        The CSS is added as a new item in the book and linked from all HTML documents,
+        relative to each document's own directory.
         """
         css_content = """/* SVO Highlighting Styles */
 .svo-subject {
@@ -158,63 +211,130 @@ class EpubParser:
         # Add the CSS item to the book
         self.book.add_item(css_item)
 
-        # Link the CSS to all HTML documents
-        for item in self.book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
-            soup = BeautifulSoup(item.get_content(), "html.parser")
-
-            # Check if CSS is already linked
-            existing_link = soup.find("link", href="style/svo-styles.css")
-            if not existing_link:
-                # Find the head element
-                head = soup.find("head")
-                if head:
-                    # Create and append the link element
-                    link_tag = soup.new_tag(
-                        "link",
-                        rel="stylesheet",
-                        type="text/css",
-                        href="style/svo-styles.css",
-                    )
-                    head.append(link_tag)
-
-                    # Update the item content
-                    item.set_content(str(soup).encode("utf-8"))
+        # Link the CSS to all HTML documents. ebooklib rebuilds each <head>
+        # from item.links on write, so registering the link there is both
+        # the only way it survives and free of any HTML parsing.
+        for item in self._documents:
+            href = posixpath.relpath(
+                css_item.file_name, posixpath.dirname(item.file_name) or "."
+            )
+            if not any(link.get("href") == href for link in item.links):
+                item.add_link(href=href, rel="stylesheet", type="text/css")
 
     def _mark_svo_in_soup(
         self, paragraph_soup: BeautifulSoup, sentence_svos: dict
-    ) -> None:
+    ) -> bool:
         """
         Marks SVO structures in the specific paragraph BeautifulSoup object.
+
+        Each text node is visited once. Components of the sentences its parent
+        contains are matched in a single regex scan and spliced in as span
+        tags, so no HTML is reparsed and no text is wrapped twice. Returns
+        whether anything was marked.
         """
-        # Use inline styles or CSS classes based on inline_css flag
-        if self.inline_css:
-            styles = {
-                "subject": 'style="color: #D95F02; font-weight: bold;"',
-                "predicate": 'style="color: #1B9E77; font-weight: bold;"',
-                "object": 'style="color: #7570B3; font-weight: bold;"',
-            }
-        else:
-            styles = {
-                "subject": 'class="svo-subject"',
-                "predicate": 'class="svo-predicate"',
-                "object": 'class="svo-object"',
-            }
-
-        # We assume sentence_svos contains only SVOs for THIS paragraph
-        for sentence, svo_list in sentence_svos.items():
-            for svo in svo_list:
-                for component, style_attr in styles.items():
-                    if svo[component]:
-                        text = svo[component]
-                        # Only search within this paragraph's text elements
-                        for element in paragraph_soup.find_all(string=True):
-                            if (
-                                text in element
-                                and sentence in element.parent.get_text()
-                            ):
-                                new_text = element.replace(
-                                    text, f"<span {style_attr}>{text}</span>"
-                                )
-                                element.replace_with(
-                                    BeautifulSoup(new_text, "html.parser")
-                                )
+        # We assume sentence_svos contains only SVOs for THIS paragraph.
+        # Sibling text nodes share a parent, so its marks and their combined
+        # pattern are built once.
+        marks_by_parent = {}
+        changed = False
+        for element in list(_text_nodes(paragraph_soup)):
+            parent = element.parent
+            if id(parent) not in marks_by_parent:
+                marks = _collect_marks(parent.get_text(), sentence_svos, self._styles)
+                marks_by_parent[id(parent)] = marks and (_marks_pattern(marks), marks)
+            if marks_by_parent[id(parent)]:
+                changed |= _wrap_marks(element, *marks_by_parent[id(parent)])
+        return changed
+
+
+class _EpubWriter(epub.EpubWriter):
+    """
+    EpubWriter that stores already-compressed media uncompressed instead of
+    deflating it a second time. Everything else is written as ebooklib does.
+
+    _write_items mirrors ebooklib 0.20's private EpubWriter._write_items, so
+    the dependency is pinned to 0.20.x; re-check it before raising the bound.
+    """
+
+    def _write_items(self) -> None:
+        for item in self.book.get_items():
+            if isinstance(item, epub.EpubNcx):
+                content = self._get_ncx()
+            elif isinstance(item, epub.EpubNav):
+                content = self._get_nav(item)
+            else:
+                content = item.get_content()
+
+            name = item.file_name
+            if item.manifest:
+                name = f"{self.book.FOLDER_NAME}/{name}"
+
+            compress_type = None
+            if (item.media_type or "").startswith(_STORED_MEDIA_TYPES):
+                compress_type = zipfile.ZIP_STORED
+            self.out.writestr(name, content, compress_type=compress_type)
+
+
+def _text_nodes(soup: Tag) -> Iterator[NavigableString]:
+    """
+    Yields the text nodes under soup, skipping comments, CDATA and other
+    strings that are not rendered text.
+    """
+    for node in soup.descendants:
+        if isinstance(node, NavigableString) and not isinstance(
+            node, PreformattedString
+        ):
+            yield node
+
+
+def _collect_marks(parent_text: str, sentence_svos: dict, styles: dict) -> dict:
+    """
+    Maps each SVO component of the sentences found in parent_text to the span
+    attributes it gets. The first role seen for a given text wins.
+    """
+    pairs = (
+        (getattr(svo, component), attrs)
+        for sentence, svo_list in sentence_svos.items()
+        if sentence in parent_text
+        for svo in svo_list
+        for component, attrs in styles.items()
+    )
+    marks = {}
+    for text, attrs in pairs:
+        if text:
+            marks.setdefault(text, attrs)
+    return marks
+
+
+def _marks_pattern(marks: dict) -> re.Pattern:
+    """
+    Compiles one alternation of all marked texts. Longer texts are tried
+    first, so a component nested in another never splits it.
+    """
+    return re.compile(
+        "|".join(re.escape(text) for text in sorted(marks, key=len, reverse=True))
+    )
+
+
+def _wrap_marks(element: NavigableString, pattern: re.Pattern, marks: dict) -> bool:
+    """
+    Replaces a text node with plain strings and span tags, wrapping every
+    occurrence of a marked text found by pattern. Returns whether the node
+    was replaced.
+    """
+    fragments = []
+    last = 0
+    for match in pattern.finditer(element):
+        if match.start() > last:
+            fragments.append(NavigableString(element[last : match.start()]))
+        span = Tag(name="span", attrs=dict(marks[match.group()]))
+        span.string = match.group()
+        fragments.append(span)
+        last = match.end()
+
+    if not fragments:
+        return False
+    if last < len(element):
+        fragments.append(NavigableString(element[last:]))
+    element.replace_with(*fragments)
+    return True